@@ -1,15 +1,188 @@
 import asyncio
 import os
-from typing import Iterable, List
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 from dotenv import load_dotenv
 from openai import AsyncOpenAI, OpenAI
 
 
+class EmbeddingBatcher:
+    """Coalesce concurrent embedding requests into shared API calls.
+
+    Texts submitted within ``max_wait`` seconds of each other are sent together
+    in requests of up to ``max_batch_size`` inputs, with at most
+    ``max_concurrency`` requests in flight. The background worker stops after
+    ``idle_timeout`` seconds without work and restarts on the next request, so
+    unused batchers hold no running task. Each caller awaits only the
+    embeddings for its own texts; if a shared request fails, each caller's
+    texts are retried on their own so one bad input cannot fail other callers.
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        embeddings_model_name: str,
+        max_batch_size: int = 128,
+        max_wait: float = 0.02,
+        max_concurrency: int = 4,
+        idle_timeout: float = 30.0,
+    ):
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size must be a positive integer")
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency must be a positive integer")
+
+        self.client = client
+        self.embeddings_model_name = embeddings_model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_concurrency = max_concurrency
+        self.idle_timeout = idle_timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._requests: Set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> List[float]:
+        """Return the embedding for a single ``text``.
+
+        Single texts are latency sensitive (typically a search query), so they
+        are sent straight away rather than waiting for the batching window or
+        queueing behind bulk requests.
+        """
+
+        embedding = await self.client.embeddings.create(
+            input=text, model=self.embeddings_model_name
+        )
+        return embedding.data[0].embedding
+
+    async def embed_many(self, texts: Iterable[str]) -> List[List[float]]:
+        """Return embeddings for ``texts`` in input order."""
+
+        self._ensure_worker()
+        caller = object()
+        futures = []
+        for text in texts:
+            future = self._loop.create_future()
+            self._queue.put_nowait((text, future, caller))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._worker = None
+
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                batch = [await asyncio.wait_for(self._queue.get(), self.idle_timeout)]
+            except asyncio.TimeoutError:
+                if self._queue.empty():
+                    return
+                continue
+            deadline = self._loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._semaphore.acquire()
+            request = self._loop.create_task(self._send(batch))
+            self._requests.add(request)
+            request.add_done_callback(self._requests.discard)
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future, object]]) -> None:
+        try:
+            batch = [item for item in batch if not item[1].done()]
+            callers: Dict[object, List[Tuple[str, asyncio.Future, object]]] = {}
+            for item in batch:
+                callers.setdefault(item[2], []).append(item)
+
+            try:
+                await self._request(batch)
+            except Exception:
+                if len(callers) <= 1:
+                    raise
+                # Isolate the failing caller instead of failing everyone in the batch
+                await asyncio.gather(
+                    *(self._request_or_fail(items) for items in callers.values())
+                )
+        except Exception as exc:
+            self._fail(batch, exc)
+        finally:
+            self._semaphore.release()
+
+    async def _request(self, batch: List[Tuple[str, asyncio.Future, object]]) -> None:
+        if not batch:
+            return
+        embedding_response = await self.client.embeddings.create(
+            input=[text for text, _, _ in batch], model=self.embeddings_model_name
+        )
+        for (_, future, _), item in zip(batch, embedding_response.data):
+            if not future.done():
+                future.set_result(item.embedding)
+
+    async def _request_or_fail(
+        self, batch: List[Tuple[str, asyncio.Future, object]]
+    ) -> None:
+        try:
+            await self._request(batch)
+        except Exception as exc:
+            self._fail(batch, exc)
+
+    @staticmethod
+    def _fail(batch: List[Tuple[str, asyncio.Future, object]], exc: Exception) -> None:
+        for _, future, _ in batch:
+            if not future.done():
+                future.set_exception(exc)
+
+@lru_cache(maxsize=32)
+def get_shared_batcher(
+    api_key: str,
+    embeddings_model_name: str,
+    max_batch_size: int = 128,
+    max_concurrency: int = 4,
+) -> EmbeddingBatcher:
+    """Return the process-wide batcher for an API key and model.
+
+    Requests are only coalesced per key, since a single API call is billed to
+    (and authorised by) one key.
+    """
+
+    return EmbeddingBatcher(
+        AsyncOpenAI(api_key=api_key),
+        embeddings_model_name,
+        max_batch_size=max_batch_size,
+        max_concurrency=max_concurrency,
+    )
+
+
 class EmbeddingModel:
     """Helper for generating embeddings via the OpenAI API."""
 
-    def __init__(self, embeddings_model_name: str = "text-embedding-3-small", api_key: str = None):
+    def __init__(
+        self,
+        embeddings_model_name: str = "text-embedding-3-small",
+        api_key: str = None,
+        batch_size: int = 128,
+        max_concurrency: int = 4,
+    ):
         load_dotenv()
         self.openai_api_key = api_key or os.getenv("OPENAI_API_KEY")
         if self.openai_api_key is None:
@@ -18,36 +191,45 @@ class EmbeddingModel:
                 "Please configure it with your OpenAI API key."
             )
 
+        if batch_size <= 0:
+            raise ValueError("batch_size must be a positive integer")
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency must be a positive integer")
+
         self.embeddings_model_name = embeddings_model_name
-        self.async_client = AsyncOpenAI(api_key=self.openai_api_key)
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.batcher = get_shared_batcher(
+            self.openai_api_key, embeddings_model_name, batch_size, max_concurrency
+        )
+        self.async_client = self.batcher.client
         self.client = OpenAI(api_key=self.openai_api_key)
 
     async def async_get_embeddings(self, list_of_text: Iterable[str]) -> List[List[float]]:
-        """Return embeddings for ``list_of_text`` using the async client."""
+        """Return embeddings for ``list_of_text`` using the async client.
 
-        embedding_response = await self.async_client.embeddings.create(
-            input=list(list_of_text), model=self.embeddings_model_name
-        )
+        Requests go through the shared :class:`EmbeddingBatcher`, so texts are
+        sent in batches of up to ``batch_size`` together with any concurrent
+        requests made with the same key; results keep the input order.
+        """
 
-        return [item.embedding for item in embedding_response.data]
+        return await self.batcher.embed_many(list_of_text)
 
     async def async_get_embedding(self, text: str) -> List[float]:
         """Return an embedding for a single text using the async client."""
 
-        embedding = await self.async_client.embeddings.create(
-            input=text, model=self.embeddings_model_name
-        )
-
-        return embedding.data[0].embedding
+        return await self.batcher.embed(text)
 
     def get_embeddings(self, list_of_text: Iterable[str]) -> List[List[float]]:
         """Return embeddings for ``list_of_text`` using the sync client."""
 
-        embedding_response = self.client.embeddings.create(
-            input=list(list_of_text), model=self.embeddings_model_name
-        )
-
-        return [item.embedding for item in embedding_response.data]
+        embeddings: List[List[float]] = []
+        for batch in self._batched(list_of_text):
+            embedding_response = self.client.embeddings.create(
+                input=batch, model=self.embeddings_model_name
+            )
+            embeddings.extend(item.embedding for item in embedding_response.data)
+        return embeddings
 
     def get_embedding(self, text: str) -> List[float]:
         """Return an embedding for a single text using the sync client."""
@@ -58,6 +240,13 @@ class EmbeddingModel:
 
         return embedding.data[0].embedding
 
+    def _batched(self, list_of_text: Iterable[str]) -> List[List[str]]:
+        texts = list(list_of_text)
+        return [
+            texts[i : i + self.batch_size]
+            for i in range(0, len(texts), self.batch_size)
+        ]
+
 
 if __name__ == "__main__":
     embedding_model = EmbeddingModel()
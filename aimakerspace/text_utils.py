@@ -110,6 +110,25 @@ class PDFLoader:
         self.load()
         return self.documents
 
+    def count_pages(self) -> int:
+        """Return the number of pages in the PDF at ``self.path``."""
+
+        with self.path.open("rb") as file_handle:
+            return len(PyPDF2.PdfReader(file_handle).pages)
+
+    def load_pages(self, start: int, stop: int) -> List[str]:
+        """Return the text of pages ``start`` up to ``stop`` of ``self.path``.
+
+        Lets callers extract page ranges of a single PDF in parallel workers.
+        """
+
+        with self.path.open("rb") as file_handle:
+            pdf_reader = PyPDF2.PdfReader(file_handle)
+            return [
+                pdf_reader.pages[index].extract_text() or ""
+                for index in range(start, min(stop, len(pdf_reader.pages)))
+            ]
+
     def _iter_documents(self) -> Iterable[str]:
         if self.path.is_dir():
             yield from self._iter_directory(self.path)
@@ -1,10 +1,16 @@
 import asyncio
+import heapq
 from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
 
 import numpy as np
 
 from aimakerspace.openai_utils.embedding import EmbeddingModel
 
+try:
+    from usearch.index import Index
+except ImportError:  # usearch is optional; fall back to exact search
+    Index = None
+
 
 def cosine_similarity(vector_a: np.ndarray, vector_b: np.ndarray) -> float:
     """Return the cosine similarity between two vectors."""
@@ -18,17 +24,74 @@ def cosine_similarity(vector_a: np.ndarray, vector_b: np.ndarray) -> float:
     return float(dot_product / (norm_a * norm_b))
 
 
+def _top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Return indices of the ``k`` highest ``scores``, best first.
+
+    Selects with ``argpartition`` in O(N) and only sorts the selected ``k``.
+    """
+
+    if k < len(scores):
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
 class VectorDatabase:
     """Minimal in-memory vector store backed by numpy arrays."""
 
     def __init__(self, embedding_model: Optional[EmbeddingModel] = None):
         self.vectors: Dict[str, np.ndarray] = {}
         self.embedding_model = embedding_model or EmbeddingModel()
+        self._keys: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._norms: Optional[np.ndarray] = None
+        self._index = None
+        self._rerank_k = 0
 
     def insert(self, key: str, vector: Iterable[float]) -> None:
         """Store ``vector`` so that it can be retrieved with ``key`` later on."""
 
-        self.vectors[key] = np.asarray(vector, dtype=float)
+        self.vectors[key] = np.asarray(vector, dtype=np.float32)
+        self._matrix = None
+        self._norms = None
+        self._index = None
+
+    def build_index(
+        self,
+        connectivity: int = 16,
+        expansion_add: int = 64,
+        expansion_search: int = 40,
+        dtype: str = "i8",
+        rerank_k: int = 20,
+    ) -> "VectorDatabase":
+        """Build an HNSW index over the stored vectors for cosine searches.
+
+        The index holds vectors scalar-quantized to ``dtype`` (int8 by
+        default), so searches fetch ``rerank_k`` candidates from it and re-rank
+        them against the full-precision vectors before returning the top ``k``.
+
+        Requires the optional ``usearch`` package; without it (or with no
+        vectors stored) searches keep using the exact linear scan. Inserting
+        new vectors drops the index, so call this once loading is complete.
+        """
+
+        if Index is None or not self.vectors:
+            return self
+
+        matrix = self._consolidate()
+        index = Index(
+            ndim=matrix.shape[1],
+            metric="cos",
+            dtype=dtype,
+            connectivity=connectivity,
+            expansion_add=expansion_add,
+            expansion_search=expansion_search,
+        )
+        index.add(np.arange(len(self._keys)), matrix)
+        self._index = index
+        self._rerank_k = rerank_k
+        return self
 
     def search(
         self,
@@ -41,13 +104,27 @@ class VectorDatabase:
         if k <= 0:
             raise ValueError("k must be a positive integer")
 
+        if distance_measure is cosine_similarity:
+            if not self.vectors:
+                return []
+
+            query = np.asarray(query_vector, dtype=np.float32)
+            rows = None
+            if self._index is not None:
+                matches = self._index.search(query, max(k, self._rerank_k))
+                rows = np.asarray(matches.keys, dtype=np.int64)
+
+            scores = self._cosine_scores(query, rows)
+            order = _top_k_indices(scores, k)
+            keys = self._keys if rows is None else [self._keys[row] for row in rows]
+            return [(keys[i], float(scores[i])) for i in order]
+
         query = np.asarray(query_vector, dtype=float)
-        scores = [
+        scores = (
             (key, distance_measure(query, vector))
             for key, vector in self.vectors.items()
-        ]
-        scores.sort(key=lambda item: item[1], reverse=True)
-        return scores[:k]
+        )
+        return heapq.nlargest(k, scores, key=lambda item: item[1])
 
     def search_by_text(
         self,
@@ -73,11 +150,57 @@ class VectorDatabase:
         """Populate the vector store asynchronously from raw text snippets."""
 
         embeddings = await self.embedding_model.async_get_embeddings(list_of_text)
+        return self.build_from_embeddings(list_of_text, embeddings)
+
+    def build_from_embeddings(
+        self, list_of_text: List[str], embeddings: Iterable[Iterable[float]]
+    ) -> "VectorDatabase":
+        """Populate the vector store from precomputed embeddings, one per text."""
+
         for text, embedding in zip(list_of_text, embeddings):
             self.insert(text, embedding)
+        if self.vectors:
+            self._consolidate()
         return self
 
 
+    def _consolidate(self) -> np.ndarray:
+        """Pack the stored vectors into one contiguous ``(N, dim)`` matrix.
+
+        Entries in ``self.vectors`` are rebound to row views of the matrix so
+        the data is not held twice.
+        """
+
+        if self._matrix is None:
+            self._keys = list(self.vectors)
+            self._matrix = np.vstack(list(self.vectors.values())).astype(
+                np.float32, copy=False
+            )
+            self._norms = np.linalg.norm(self._matrix, axis=1)
+            for row, key in enumerate(self._keys):
+                self.vectors[key] = self._matrix[row]
+        return self._matrix
+
+    def _cosine_scores(
+        self, query: np.ndarray, rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Cosine similarity of ``query`` against all rows, or only ``rows``."""
+
+        matrix = self._consolidate()
+        query_norm = np.linalg.norm(query)
+        if rows is None:
+            dots, norms = matrix @ query, self._norms
+        else:
+            dots, norms = matrix[rows] @ query, self._norms[rows]
+        denominators = norms * query_norm
+        return np.divide(
+            dots,
+            denominators,
+            out=np.zeros_like(dots),
+            where=denominators != 0,
+        )
+
+
 if __name__ == "__main__":
     list_of_text = [
         "I like to eat broccoli and bananas.",
@@ -1,15 +1,36 @@
 # Import required FastAPI components for building the API
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form
-from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
+try:
+    # FastAPI 0.135+ ships a Server-Sent Events response class
+    from fastapi.sse import EventSourceResponse
+except ImportError:
+    class EventSourceResponse(StreamingResponse):
+        media_type = "text/event-stream"
 from fastapi.middleware.cors import CORSMiddleware
 # Import Pydantic for data validation and settings management
 from pydantic import BaseModel
 # Import OpenAI client for interacting with OpenAI's API
-from openai import OpenAI
+from openai import AsyncOpenAI
+# Import cachetools for bounded in-process caches
+from cachetools import LRUCache, TTLCache
+import numpy as np
+import asyncio
+import hashlib
+import json
+import multiprocessing
 import os
+import shutil
+import stat
 import tempfile
+import time
 import uuid
-from typing import Optional, Dict, List
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import AsyncIterator, Optional, Dict, List, Tuple
 from pathlib import Path
 
 # Import aimakerspace library components for RAG
@@ -19,17 +40,24 @@ from aimakerspace.openai_utils.chatmodel import ChatOpenAI
 from aimakerspace.openai_utils.embedding import EmbeddingModel
 from aimakerspace.openai_utils.prompts import SystemRolePrompt, UserRolePrompt
 
-# Initialize FastAPI application with a title
-app = FastAPI(title="OpenAI Chat API")
+# Initialize FastAPI application with a title; JSON responses are serialized with orjson
+app = FastAPI(title="OpenAI Chat API", default_response_class=ORJSONResponse)
 
 # Configure CORS (Cross-Origin Resource Sharing) middleware
-# This allows the API to be accessed from different domains/origins
+# This allows the API to be accessed from the frontend's domain(s), given as a
+# comma-separated FRONTEND_ORIGIN list
+FRONTEND_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("FRONTEND_ORIGIN", "http://localhost:3000").split(",")
+    if origin.strip()
+]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Allows requests from any origin
+    allow_origins=FRONTEND_ORIGINS,  # Only the configured frontend origins
     allow_credentials=True,  # Allows cookies to be included in requests
-    allow_methods=["*"],  # Allows all HTTP methods (GET, POST, etc.)
-    allow_headers=["*"],  # Allows all headers in requests
+    allow_methods=["GET", "POST", "DELETE"],  # Methods used by the API
+    allow_headers=["content-type", "authorization"],  # Headers the frontend sends
+    max_age=86400,  # Let browsers cache preflight responses for a day
 )
 
 # Define the data model for chat requests using Pydantic
@@ -47,9 +75,21 @@ class RAGChatRequest(BaseModel):
     api_key: str          # OpenAI API key for authentication
     model: Optional[str] = "gpt-4o-mini"  # Optional model selection with default
 
-# Global storage for RAG sessions
+# Global storage for RAG sessions, bounded so idle sessions are evicted
 # In production, this should be replaced with a proper database
-rag_sessions: Dict[str, Dict] = {}
+SESSION_MAX_COUNT = 128
+SESSION_TTL_SECONDS = 3600
+rag_sessions: Dict[str, Dict] = TTLCache(maxsize=SESSION_MAX_COUNT, ttl=SESSION_TTL_SECONDS)
+
+# Retrieved context keyed by (session_id, user_message) so repeated questions
+# skip both the query embedding call and the vector search
+retrieval_cache = LRUCache(maxsize=1024)
+
+# Recent (normalized query embedding, chunks) pairs per session so near-duplicate
+# questions reuse an earlier retrieval instead of searching again
+semantic_cache = LRUCache(maxsize=128)
+SEMANTIC_CACHE_SIZE = 32
+SEMANTIC_CACHE_THRESHOLD = 0.97
 
 # RAG system prompt
 RAG_SYSTEM_PROMPT = """You are a helpful assistant that answers questions based on the provided context from uploaded PDF documents. 
@@ -57,32 +97,239 @@ You should only answer questions using information from the provided context. If
 you should say "I don't have enough information in the provided context to answer that question." 
 Do not make up or hallucinate information that isn't in the context."""
 
+# Headers that stop proxies from buffering or caching token streams
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+# Shared splitter for uploaded PDFs; it holds only its configuration
+TEXT_SPLITTER = CharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+
+# HNSW index parameters for uploaded PDFs, overridable without a redeploy
+HNSW_M = int(os.getenv("HNSW_M", "24"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EFC", "128"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EFS", "100"))
+
+# On-disk cache of chunk embeddings keyed by PDF content, so re-uploads skip
+# parsing, splitting and embedding entirely. The directory must be private to
+# this user, since cached chunks are fed verbatim into the RAG prompt
+EMBEDDING_CACHE_DIR = Path(os.getenv(
+    "EMBEDDING_CACHE_DIR",
+    Path(tempfile.gettempdir()) / f"rag-embedding-cache-{os.getuid() if hasattr(os, 'getuid') else 'user'}",
+))
+EMBEDDING_CACHE_TTL_SECONDS = int(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# PDFs are only split across processes when each worker gets at least this many pages
+PDF_MIN_PAGES_PER_WORKER = 8
+PDF_MAX_WORKERS = os.cpu_count() or 1
+pdf_executor: Optional[ProcessPoolExecutor] = None
+pdf_executor_available = True
+
+# Size of each read when spooling an uploaded PDF to disk (1 MiB)
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+@lru_cache(maxsize=32)
+def _openai_client(api_key: str) -> AsyncOpenAI:
+    """Return a shared async OpenAI client per API key so its connection pool is reused."""
+    return AsyncOpenAI(api_key=api_key)
+
+@lru_cache(maxsize=64)
+def _chat_model(model: str, api_key: str) -> ChatOpenAI:
+    """Return a shared ChatOpenAI per model and API key; it holds no per-request state."""
+    return ChatOpenAI(model_name=model, api_key=api_key)
+
+async def _sse_events(tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Encode streamed tokens as Server-Sent Events with JSON string data."""
+    async for token in tokens:
+        yield f"data: {json.dumps(token)}\n\n"
+
+async def _retrieve(session_id: str, vector_db: VectorDatabase, query: str, k: int = 3) -> List[str]:
+    """Return the ``k`` chunks most relevant to ``query``, using the retrieval caches."""
+    cache_key = (session_id, query)
+    if cache_key in retrieval_cache:
+        return retrieval_cache[cache_key]
+    
+    query_vector = np.asarray(
+        await vector_db.embedding_model.async_get_embedding(query), dtype=np.float32
+    )
+    query_norm = np.linalg.norm(query_vector)
+    if query_norm:
+        query_vector /= query_norm
+    
+    recent = semantic_cache.get(session_id)
+    if recent is None:
+        recent = semantic_cache[session_id] = deque(maxlen=SEMANTIC_CACHE_SIZE)
+    
+    for cached_vector, cached_chunks in recent:
+        if float(cached_vector @ query_vector) >= SEMANTIC_CACHE_THRESHOLD:
+            chunks = cached_chunks
+            break
+    else:
+        chunks = [key for key, _ in vector_db.search(query_vector, k)]
+        recent.append((query_vector, chunks))
+    
+    retrieval_cache[cache_key] = chunks
+    return chunks
+
+def _load_pdf(path: str) -> List[str]:
+    """Extract the text of the PDF at ``path``."""
+    pdf_loader = PDFLoader(path)
+    pdf_loader.load_file()
+    return pdf_loader.documents
+
+def _pdf_executor() -> Optional[ProcessPoolExecutor]:
+    """Return the shared process pool for PDF extraction, or None if unavailable."""
+    global pdf_executor, pdf_executor_available
+    if pdf_executor is None and pdf_executor_available:
+        try:
+            # Never fork the server itself: it runs threads whose locks could be
+            # held at fork time, and holds every session's vectors in memory
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            pdf_executor = ProcessPoolExecutor(
+                max_workers=PDF_MAX_WORKERS,
+                mp_context=multiprocessing.get_context(start_method),
+            )
+        except (OSError, NotImplementedError):
+            # Some serverless runtimes lack the primitives multiprocessing needs
+            pdf_executor_available = False
+    return pdf_executor
+
+async def _aload_pdf(path: str) -> List[str]:
+    """Extract the text of the PDF at ``path``, splitting large PDFs across processes."""
+    global pdf_executor
+    pdf_loader = PDFLoader(path)
+    page_count = await run_in_threadpool(pdf_loader.count_pages)
+    workers = min(PDF_MAX_WORKERS, page_count // PDF_MIN_PAGES_PER_WORKER)
+    executor = _pdf_executor() if workers > 1 else None
+    if executor is None:
+        return await run_in_threadpool(_load_pdf, path)
+    
+    # Give each worker a contiguous page range so it parses the file only once
+    step = -(-page_count // workers)
+    loop = asyncio.get_running_loop()
+    try:
+        page_ranges = await asyncio.gather(*[
+            loop.run_in_executor(executor, pdf_loader.load_pages, start, start + step)
+            for start in range(0, page_count, step)
+        ])
+    except (BrokenProcessPool, OSError):
+        # A worker died or could not be started; shut the pool down so the next
+        # upload starts a fresh one
+        executor.shutdown(wait=False, cancel_futures=True)
+        if pdf_executor is executor:
+            pdf_executor = None
+        return await run_in_threadpool(_load_pdf, path)
+    
+    return ["\n".join(page for pages in page_ranges for page in pages)]
+
+def _embedding_cache_key(path: str, embeddings_model_name: str) -> str:
+    """Hash the PDF at ``path`` together with the settings that shape its embeddings."""
+    with open(path, 'rb') as pdf_file:
+        digest = hashlib.file_digest(pdf_file, lambda: hashlib.blake2b(digest_size=32))
+    digest.update(
+        f"{embeddings_model_name}:{TEXT_SPLITTER.chunk_size}:{TEXT_SPLITTER.chunk_overlap}".encode()
+    )
+    return digest.hexdigest()
+
+def _load_cached_embeddings(cache_key: str) -> Optional[Tuple[List[str], np.ndarray]]:
+    """Return cached ``(chunks, embeddings)`` for ``cache_key`` if present and fresh."""
+    chunks_path = EMBEDDING_CACHE_DIR / f"{cache_key}.chunks.json"
+    embeddings_path = EMBEDDING_CACHE_DIR / f"{cache_key}.npy"
+    try:
+        if not _embedding_cache_dir_is_private():
+            return None
+        if time.time() - embeddings_path.stat().st_mtime > EMBEDDING_CACHE_TTL_SECONDS:
+            return None
+        chunks = json.loads(chunks_path.read_text(encoding="utf-8"))
+        embeddings = np.load(embeddings_path)
+        if len(chunks) != len(embeddings):
+            return None
+        
+        # Refresh the entry so frequently uploaded documents stay cached
+        os.utime(chunks_path)
+        os.utime(embeddings_path)
+    except (OSError, ValueError):
+        return None
+    return chunks, embeddings
+
+def _store_cached_embeddings(cache_key: str, chunks: List[str], vector_db: VectorDatabase) -> None:
+    """Persist ``chunks`` and their embeddings, evicting expired cache entries."""
+    embeddings = np.vstack([vector_db.retrieve_from_key(chunk) for chunk in chunks])
+    try:
+        EMBEDDING_CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+        if not _embedding_cache_dir_is_private():
+            return
+        _evict_expired_embeddings()
+        
+        # Write via temporary files so readers never see a partial entry; the
+        # embeddings file goes last since its presence marks a complete entry
+        _write_cache_file(
+            EMBEDDING_CACHE_DIR / f"{cache_key}.chunks.json",
+            lambda cache_file: cache_file.write(json.dumps(chunks).encode("utf-8")),
+        )
+        _write_cache_file(
+            EMBEDDING_CACHE_DIR / f"{cache_key}.npy",
+            lambda cache_file: np.save(cache_file, embeddings),
+        )
+    except OSError:
+        # The cache is best effort; the session itself is already built
+        pass
+
+def _embedding_cache_dir_is_private() -> bool:
+    """Return whether the cache dir is a real directory only this user can write to."""
+    dir_stat = EMBEDDING_CACHE_DIR.lstat()
+    if not stat.S_ISDIR(dir_stat.st_mode):
+        return False
+    if hasattr(os, "getuid") and dir_stat.st_uid != os.getuid():
+        return False
+    return not dir_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+def _write_cache_file(path: Path, write) -> None:
+    """Atomically create ``path`` by calling ``write`` on a uniquely named temp file."""
+    temp_fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(temp_fd, 'wb') as temp_file:
+            write(temp_file)
+        os.replace(temp_path, path)
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+
+def _evict_expired_embeddings() -> None:
+    """Delete cache files not used within the TTL."""
+    cutoff = time.time() - EMBEDDING_CACHE_TTL_SECONDS
+    for entry in EMBEDDING_CACHE_DIR.iterdir():
+        try:
+            if entry.stat().st_mtime < cutoff:
+                entry.unlink()
+        except OSError:
+            pass
+
 # Define the main chat endpoint that handles POST requests
 @app.post("/api/chat")
 async def chat(request: ChatRequest):
     try:
-        # Initialize OpenAI client with the provided API key
-        client = OpenAI(api_key=request.api_key)
+        # Get the (cached) OpenAI client for the provided API key
+        client = _openai_client(request.api_key)
+        
+        # Create a streaming chat completion request; awaiting it here means
+        # authentication and request errors are reported as HTTP errors
+        stream = await client.chat.completions.create(
+            model=request.model,
+            messages=[
+                {"role": "developer", "content": request.developer_message},
+                {"role": "user", "content": request.user_message}
+            ],
+            stream=True  # Enable streaming response
+        )
         
         # Create an async generator function for streaming responses
         async def generate():
-            # Create a streaming chat completion request
-            stream = client.chat.completions.create(
-                model=request.model,
-                messages=[
-                    {"role": "developer", "content": request.developer_message},
-                    {"role": "user", "content": request.user_message}
-                ],
-                stream=True  # Enable streaming response
-            )
-            
             # Yield each chunk of the response as it becomes available
-            for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content is not None:
                     yield chunk.choices[0].delta.content
 
         # Return a streaming response to the client
-        return StreamingResponse(generate(), media_type="text/plain")
+        return EventSourceResponse(_sse_events(generate()), headers=SSE_HEADERS)
     
     except Exception as e:
         # Handle any errors that occur during processing
@@ -104,30 +351,50 @@ async def upload_pdf(
         session_id = str(uuid.uuid4())
         
         # Create temporary file to store the PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
+        temp_fd, temp_file_path = tempfile.mkstemp(suffix='.pdf')
         
         try:
-            # Load and process the PDF using aimakerspace library
-            pdf_loader = PDFLoader(temp_file_path)
-            pdf_loader.load_file()
+            # Copy the upload to disk in fixed-size chunks so memory stays constant;
+            # the whole copy runs in one threadpool call off the event loop
+            with os.fdopen(temp_fd, 'wb') as temp_file:
+                await run_in_threadpool(shutil.copyfileobj, file.file, temp_file, UPLOAD_CHUNK_SIZE)
             
-            # Split the text into chunks
-            text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-            chunks = text_splitter.split_texts(pdf_loader.documents)
-            
-            # Create vector database and index the chunks
             embedding_model = EmbeddingModel(api_key=api_key)
             vector_db = VectorDatabase(embedding_model=embedding_model)
-            vector_db = await vector_db.abuild_from_list(chunks)
+            
+            # Reuse chunks and embeddings from an earlier upload of the same PDF
+            cache_key = await run_in_threadpool(
+                _embedding_cache_key, temp_file_path, embedding_model.embeddings_model_name
+            )
+            cached = await run_in_threadpool(_load_cached_embeddings, cache_key)
+            if cached is not None:
+                chunks, embeddings = cached
+                await run_in_threadpool(vector_db.build_from_embeddings, chunks, embeddings)
+            else:
+                # Load and process the PDF using aimakerspace library off the event loop,
+                # in parallel across processes for large PDFs
+                pdf_docs = await _aload_pdf(temp_file_path)
+                
+                # Split the text into chunks
+                chunks = await run_in_threadpool(TEXT_SPLITTER.split_texts, pdf_docs)
+                
+                # Create vector database and index the chunks
+                vector_db = await vector_db.abuild_from_list(chunks)
+                if chunks:
+                    await run_in_threadpool(_store_cached_embeddings, cache_key, chunks, vector_db)
+            
+            await run_in_threadpool(
+                vector_db.build_index,
+                connectivity=HNSW_M,
+                expansion_add=HNSW_EF_CONSTRUCTION,
+                expansion_search=HNSW_EF_SEARCH,
+            )
             
             # Store the session data
             rag_sessions[session_id] = {
                 "vector_db": vector_db,
                 "filename": file.filename,
-                "chunks": chunks,
+                "chunks_count": len(chunks),
                 "created_at": str(uuid.uuid4())  # Simple timestamp placeholder
             }
             
@@ -155,14 +422,12 @@ async def rag_chat(request: RAGChatRequest):
             raise HTTPException(status_code=404, detail="Session not found. Please upload a PDF first.")
         
         session_data = rag_sessions[request.session_id]
+        # Re-insert to restart the session's idle timer
+        rag_sessions[request.session_id] = session_data
         vector_db = session_data["vector_db"]
         
-        # Search for relevant chunks
-        relevant_chunks = vector_db.search_by_text(
-            request.user_message, 
-            k=3,  # Get top 3 most relevant chunks
-            return_as_text=True
-        )
+        # Search for relevant chunks (top 3), reusing cached results where possible
+        relevant_chunks = await _retrieve(request.session_id, vector_db, request.user_message, k=3)
         
         # Combine relevant chunks into context
         context = "\n\n".join(relevant_chunks)
@@ -176,15 +441,15 @@ async def rag_chat(request: RAGChatRequest):
             user_prompt.create_message(context=context, question=request.user_message)
         ]
         
-        # Initialize chat model with API key from request
-        chat_model = ChatOpenAI(model_name=request.model, api_key=request.api_key)
+        # Get the (cached) chat model for the requested model and API key
+        chat_model = _chat_model(request.model, request.api_key)
         
         # Create streaming response
         async def generate():
             async for chunk in chat_model.astream(messages):
                 yield chunk
         
-        return StreamingResponse(generate(), media_type="text/plain")
+        return EventSourceResponse(_sse_events(generate()), headers=SSE_HEADERS)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in RAG chat: {str(e)}")
@@ -200,10 +465,23 @@ async def get_session_info(session_id: str):
     return {
         "session_id": session_id,
         "filename": session_data["filename"],
-        "chunks_count": len(session_data["chunks"]),
+        "chunks_count": session_data["chunks_count"],
         "created_at": session_data["created_at"]
     }
 
+# Define endpoint to delete a session and free its index
+@app.delete("/api/session/{session_id}")
+async def delete_session(session_id: str):
+    """Delete a RAG session and its cached retrievals."""
+    if rag_sessions.pop(session_id, None) is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    semantic_cache.pop(session_id, None)
+    for cache_key in [key for key in retrieval_cache if key[0] == session_id]:
+        del retrieval_cache[cache_key]
+    
+    return {"session_id": session_id, "message": "Session deleted"}
+
 # Define a health check endpoint to verify API status
 @app.get("/api/health")
 async def health_check():
@@ -119,14 +119,24 @@ function App() {
       const reader = response.data.getReader();
       const decoder = new TextDecoder();
       let assistantMessage = '';
+      let buffer = '';
 
       const processChunk = async () => {
         const { done, value } = await reader.read();
         if (done) return;
 
-        const chunk = decoder.decode(value);
-        assistantMessage += chunk;
-        
+        // The API streams Server-Sent Events whose data is a JSON-encoded token
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const event of events) {
+          for (const line of event.split('\n')) {
+            if (line.startsWith('data: ')) {
+              assistantMessage += JSON.parse(line.slice(6));
+            }
+          }
+        }
+
         setMessages(prev => {
           const newMessages = [...prev];
           newMessages[newMessages.length - 1].content = assistantMessage;